@@ -1,11 +1,43 @@
 import pandas as pd
-from neo4j import GraphDatabase
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from neo4j_connection import get_driver, release_driver
+from typing import Dict, List, Optional, Tuple
+import argparse
 import logging
+import os
+import shutil
+import subprocess
+
+# Number of rows sent per UNWIND statement
+BATCH_SIZE = 5000
+
+# Rows committed per transaction by LOAD CSV ... CALL IN TRANSACTIONS
+LOAD_CSV_BATCH_SIZE = 1000
+
+# CSV columns stored as properties on Movie nodes
+MOVIE_COLUMNS = ['rank', 'name', 'year', 'rating', 'certificate', 'run_time', 'tagline', 'budget', 'box_office']
+
+# Multi-valued CSV columns, keyed by the relationship they produce
+RELATIONSHIP_COLUMNS = {
+    'BELONGS_TO': 'genre',
+    'DIRECTED': 'directors',
+    'WROTE': 'writers',
+    'ACTED_IN': 'casts'
+}
+
+
+def chunked(rows: List, size: int):
+    """Yield successive slices of at most `size` rows"""
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
 
 
 class IMDBKnowledgeGraph:
-    def __init__(self, uri: str, user: str, password: str):
+    def __init__(self, uri: str, user: str, password: str, database: str = "neo4j",
+                 max_connection_pool_size: int = 50,
+                 connection_acquisition_timeout: float = 30.0,
+                 max_connection_lifetime: float = 600.0,
+                 connection_timeout: float = 15.0):
         """
         Initialize Neo4j connection
 
@@ -13,17 +45,30 @@ class IMDBKnowledgeGraph:
             uri: Neo4j database URI
             user: Username
             password: Password
+            database: Name of the database to use for every session
+            max_connection_pool_size: Maximum number of pooled connections
+            connection_acquisition_timeout: Seconds to wait for a pooled connection
+            max_connection_lifetime: Seconds before a pooled connection is recycled
+            connection_timeout: Seconds to wait when opening a new connection
         """
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = get_driver(
+            uri, user, password,
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+            max_connection_lifetime=max_connection_lifetime,
+            connection_timeout=connection_timeout
+        )
+        self.max_connection_pool_size = max_connection_pool_size
+        self.database = database
         self.logger = logging.getLogger(__name__)
 
     def close(self):
-        """Close the database connection"""
-        self.driver.close()
+        """Release the shared database driver"""
+        release_driver(self.driver)
 
     def create_constraints_and_indexes(self):
         """Create constraints and indexes for better performance"""
-        with self.driver.session() as session:
+        with self.driver.session(database=self.database) as session:
             # Create constraints
             constraints = [
                 "CREATE CONSTRAINT movie_id IF NOT EXISTS FOR (m:Movie) REQUIRE m.id IS UNIQUE",
@@ -34,7 +79,10 @@ class IMDBKnowledgeGraph:
             # Create indexes
             indexes = [
                 "CREATE INDEX movie_name IF NOT EXISTS FOR (m:Movie) ON (m.name)",
-                "CREATE INDEX person_name IF NOT EXISTS FOR (p:Person) ON (p.name)"
+                "CREATE INDEX person_name IF NOT EXISTS FOR (p:Person) ON (p.name)",
+                # Back the ORDER BY m.rating DESC of the filmography queries
+                "CREATE INDEX movie_rating IF NOT EXISTS FOR (m:Movie) ON (m.rating)",
+                "CREATE INDEX movie_year_rating IF NOT EXISTS FOR (m:Movie) ON (m.year, m.rating)"
             ]
 
             for constraint in constraints:
@@ -42,86 +90,291 @@ class IMDBKnowledgeGraph:
             for index in indexes:
                 session.run(index)
 
-    def create_movie_node(self, tx, movie_data: Dict):
-        """Create a movie node with its properties"""
+    def create_movie_nodes(self, tx, movie_rows: List[Dict]):
+        """Create a batch of movie nodes with their properties"""
         query = """
-        MERGE (m:Movie {id: $rank})
-        SET m.name = $name,
-            m.year = $year,
-            m.rating = $rating,
-            m.certificate = $certificate,
-            m.run_time = $run_time,
-            m.tagline = $tagline,
-            m.budget = $budget,
-            m.box_office = $box_office
-        """
-        tx.run(query, **movie_data)
-
-    def create_genre_relationships(self, tx, movie_id: int, genres: List[str]):
-        """Create relationships between movies and genres"""
+        UNWIND $rows AS r
+        MERGE (m:Movie {id: r.rank})
+        SET m.name = r.name,
+            m.year = r.year,
+            m.rating = r.rating,
+            m.certificate = r.certificate,
+            m.run_time = r.run_time,
+            m.tagline = r.tagline,
+            m.budget = r.budget,
+            m.box_office = r.box_office
+        """
+        tx.run(query, rows=movie_rows)
+
+    def create_named_nodes(self, tx, label: str, names: List[str]):
+        """Create a batch of nodes identified by name"""
+        query = f"""
+        UNWIND $names AS name
+        MERGE (:{label} {{name: name}})
+        """
+        tx.run(query, names=names)
+
+    def create_genre_relationships(self, tx, pairs: List[Dict]):
+        """Create a batch of relationships between movies and existing genres"""
         query = """
-        MATCH (m:Movie {id: $movie_id})
-        MERGE (g:Genre {name: $genre})
+        UNWIND $pairs AS p
+        MATCH (m:Movie {id: p.mid})
+        MATCH (g:Genre {name: p.name})
         MERGE (m)-[:BELONGS_TO]->(g)
         """
-        for genre in genres:
-            tx.run(query, movie_id=movie_id, genre=genre.strip())
+        tx.run(query, pairs=pairs)
 
-    def create_person_relationships(self, tx, movie_id: int, role_type: str, persons: List[str]):
-        """Create relationships between people and movies"""
+    def create_person_relationships(self, tx, role_type: str, pairs: List[Dict]):
+        """Create a batch of relationships between existing people and movies"""
         query = f"""
-        MATCH (m:Movie {{id: $movie_id}})
-        MERGE (p:Person {{name: $person}})
-        MERGE (p)-[:{role_type}]->(m)
+        UNWIND $pairs AS p
+        MATCH (m:Movie {{id: p.mid}})
+        MATCH (x:Person {{name: p.name}})
+        MERGE (x)-[:{role_type}]->(m)
+        """
+        tx.run(query, pairs=pairs)
+
+    def write_batches(self, work, batches: List[Tuple], max_workers: int):
+        """
+        Run write transactions concurrently, one session per worker thread
+
+        Args:
+            work: Transaction function to run
+            batches: Extra arguments passed to `work` for each transaction
+            max_workers: Number of concurrent sessions
         """
-        for person in persons:
-            tx.run(query, movie_id=movie_id, person=person.strip())
+        def write(args: Tuple):
+            with self.driver.session(database=self.database) as session:
+                session.execute_write(work, *args)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(write, batches))
+
+    def prepare_data(self, csv_path: str) -> Tuple[pd.DataFrame, Dict[str, pd.DataFrame]]:
+        """
+        Load the CSV file and split it into movie rows and relationship pairs
+
+        Args:
+            csv_path: Path to the IMDB CSV file
 
-    def import_data(self, csv_path: str):
-        """Import data from CSV file into Neo4j"""
+        Returns:
+            Movie rows, and a (mid, name) pair frame for each relationship type
+        """
         df = pd.read_csv(csv_path)
 
-        with self.driver.session() as session:
-            for _, row in df.iterrows():
-                try:
-                    # Create movie node
-                    movie_data = {
-                        'rank': int(row['rank']),
-                        'name': row['name'],
-                        'year': int(row['year']),
-                        'rating': float(row['rating']),
-                        'certificate': row['certificate'],
-                        'run_time': row['run_time'],
-                        'tagline': row['tagline'],
-                        'budget': row['budget'],
-                        'box_office': row['box_office']
-                    }
-                    session.execute_write(self.create_movie_node, movie_data)
-
-                    # Create genre relationships
-                    genres = row['genre'].split(',')
-                    session.execute_write(self.create_genre_relationships, movie_data['rank'], genres)
-
-                    # Create director relationships
-                    directors = row['directors'].split(',')
-                    session.execute_write(self.create_person_relationships, movie_data['rank'], 'DIRECTED', directors)
-
-                    # Create writer relationships
-                    writers = row['writers'].split(',')
-                    session.execute_write(self.create_person_relationships, movie_data['rank'], 'WROTE', writers)
-
-                    # Create actor relationships
-                    actors = row['casts'].split(',')
-                    session.execute_write(self.create_person_relationships, movie_data['rank'], 'ACTED_IN', actors)
-
-                    self.logger.info(f"Successfully processed movie: {movie_data['name']}")
-                except Exception as e:
-                    self.logger.error(f"Error processing movie {row['name']}: {str(e)}")
+        # Validate the whole frame up front so that bad rows never reach Neo4j
+        for column in ['rank', 'year', 'rating']:
+            df[column] = pd.to_numeric(df[column], errors='coerce')
+        bad = df[['rank', 'year', 'rating', *RELATIONSHIP_COLUMNS.values()]].isna().any(axis=1)
+        if bad.any():
+            self.logger.warning("Dropping %d rows with missing or invalid values", bad.sum())
+            df = df[~bad]
+        df = df.astype({'rank': 'int32', 'year': 'int32', 'rating': 'float64'})
+
+        # Split the multi-valued columns once for the whole frame
+        def pairs_for(column: str) -> pd.DataFrame:
+            pairs = df[['rank', column]].rename(columns={'rank': 'mid', column: 'name'})
+            pairs = pairs.assign(name=pairs['name'].str.split(',')).explode('name')
+            pairs['name'] = pairs['name'].str.strip()
+            return pairs
+
+        relationships = {
+            role_type: pairs_for(column) for role_type, column in RELATIONSHIP_COLUMNS.items()
+        }
+        return df[MOVIE_COLUMNS], relationships
+
+    def import_data(self, csv_path: str, max_workers: int = 8):
+        """
+        Import data from CSV file into Neo4j
+
+        Nodes are created before relationships and batches are written
+        concurrently. The node phases only touch distinct keys; relationship
+        batches may lock the same Person and Movie nodes, and conflicting
+        transactions are retried by execute_write.
+
+        Args:
+            csv_path: Path to the IMDB CSV file
+            max_workers: Number of concurrent sessions, capped at the connection pool size
+        """
+        max_workers = min(max_workers, self.max_connection_pool_size)
+        movies, relationships = self.prepare_data(csv_path)
+        relationships = {
+            role_type: pairs.drop_duplicates() for role_type, pairs in relationships.items()
+        }
+
+        movie_rows = movies.to_dict('records')
+        self.write_batches(self.create_movie_nodes,
+                           [(batch,) for batch in chunked(movie_rows, BATCH_SIZE)], max_workers)
+
+        genres = relationships['BELONGS_TO']['name'].unique().tolist()
+        persons = pd.concat([
+            pairs['name'] for role_type, pairs in relationships.items() if role_type != 'BELONGS_TO'
+        ]).unique().tolist()
+        self.write_batches(self.create_named_nodes,
+                           [('Genre', batch) for batch in chunked(genres, BATCH_SIZE)] +
+                           [('Person', batch) for batch in chunked(persons, BATCH_SIZE)], max_workers)
+
+        genre_pairs = relationships.pop('BELONGS_TO').to_dict('records')
+        self.write_batches(self.create_genre_relationships,
+                           [(batch,) for batch in chunked(genre_pairs, BATCH_SIZE)], max_workers)
+        self.write_batches(self.create_person_relationships,
+                           [(role_type, batch)
+                            for role_type, pairs in relationships.items()
+                            for batch in chunked(pairs.to_dict('records'), BATCH_SIZE)], max_workers)
+
+        self.logger.info("Successfully processed %d movies", len(movie_rows))
+
+    def load_csv(self, csv_path: str, neo4j_import_dir: Optional[str] = None):
+        """
+        Import data by letting Neo4j read the CSV file with LOAD CSV
+
+        The server streams the rows itself and commits every
+        LOAD_CSV_BATCH_SIZE rows, so no row data travels through Python.
+
+        Args:
+            csv_path: Path to the IMDB CSV file
+            neo4j_import_dir: Neo4j import directory to copy the file into; if omitted
+                the file is expected to be there already
+        """
+        if neo4j_import_dir:
+            shutil.copy(csv_path, neo4j_import_dir)
+        url = f"file:///{os.path.basename(csv_path)}"
+
+        queries = [
+            # Movie nodes
+            f"""
+            LOAD CSV WITH HEADERS FROM $url AS row
+            CALL {{
+                WITH row
+                MERGE (m:Movie {{id: toInteger(row.rank)}})
+                SET m.name = row.name,
+                    m.year = toInteger(row.year),
+                    m.rating = toFloat(row.rating),
+                    m.certificate = row.certificate,
+                    m.run_time = row.run_time,
+                    m.tagline = row.tagline,
+                    m.budget = row.budget,
+                    m.box_office = row.box_office
+            }} IN TRANSACTIONS OF {LOAD_CSV_BATCH_SIZE} ROWS
+            """,
+            # Person nodes
+            f"""
+            LOAD CSV WITH HEADERS FROM $url AS row
+            CALL {{
+                WITH row
+                UNWIND coalesce(split(row.directors, ','), []) +
+                       coalesce(split(row.writers, ','), []) +
+                       coalesce(split(row.casts, ','), []) AS name
+                MERGE (:Person {{name: trim(name)}})
+            }} IN TRANSACTIONS OF {LOAD_CSV_BATCH_SIZE} ROWS
+            """,
+            # Genre nodes and all relationships
+            f"""
+            LOAD CSV WITH HEADERS FROM $url AS row
+            CALL {{
+                WITH row
+                MATCH (m:Movie {{id: toInteger(row.rank)}})
+                FOREACH (name IN coalesce(split(row.genre, ','), []) |
+                    MERGE (g:Genre {{name: trim(name)}})
+                    MERGE (m)-[:BELONGS_TO]->(g))
+                FOREACH (name IN coalesce(split(row.directors, ','), []) |
+                    MERGE (p:Person {{name: trim(name)}})
+                    MERGE (p)-[:DIRECTED]->(m))
+                FOREACH (name IN coalesce(split(row.writers, ','), []) |
+                    MERGE (p:Person {{name: trim(name)}})
+                    MERGE (p)-[:WROTE]->(m))
+                FOREACH (name IN coalesce(split(row.casts, ','), []) |
+                    MERGE (p:Person {{name: trim(name)}})
+                    MERGE (p)-[:ACTED_IN]->(m))
+            }} IN TRANSACTIONS OF {LOAD_CSV_BATCH_SIZE} ROWS
+            """
+        ]
+
+        # CALL { ... } IN TRANSACTIONS only runs in auto-commit transactions
+        with self.driver.session(database=self.database) as session:
+            for query in queries:
+                session.run(query, url=url).consume()
+
+        self.logger.info("LOAD CSV import of %s completed", url)
+
+    def bulk_import(self, csv_path: str, db_name: str, import_dir: str = "bulk_import",
+                    neo4j_admin: str = "neo4j-admin", overwrite: bool = False):
+        """
+        Cold-load the CSV file with `neo4j-admin database import full`
+
+        The importer writes store files directly, so the target database must be
+        stopped or not yet created. An existing store is only replaced when
+        `overwrite` is set; otherwise neo4j-admin refuses to run. Indexes and constraints
+        are not built during the import; call create_constraints_and_indexes()
+        once the database has been started.
+
+        Args:
+            csv_path: Path to the IMDB CSV file
+            db_name: Name of the database to create
+            import_dir: Directory for the generated node and relationship files
+            neo4j_admin: Path to the neo4j-admin executable
+            overwrite: Replace the existing store of the target database
+        """
+        movies, relationships = self.prepare_data(csv_path)
+        os.makedirs(import_dir, exist_ok=True)
+
+        def write(name: str, frame: pd.DataFrame, header: List[str]) -> str:
+            path = os.path.join(import_dir, name)
+            frame.drop_duplicates().to_csv(path, index=False, header=header)
+            return path
+
+        # The ID column is not stored, so the rank is repeated as the integer id property
+        movies = movies.rename(columns={'rank': 'id'})
+        movies.insert(0, 'movie_id', movies['id'])
+        movie_file = write('movies_nodes.csv', movies, [
+            ':ID(Movie)', 'id:int', 'name', 'year:int', 'rating:double', 'certificate',
+            'run_time', 'tagline', 'budget', 'box_office'
+        ])
+
+        genres = relationships.pop('BELONGS_TO')
+        genre_file = write('genres_nodes.csv', genres[['name']], ['name:ID(Genre)'])
+        person_file = write('persons_nodes.csv',
+                            pd.concat([pairs[['name']] for pairs in relationships.values()]),
+                            ['name:ID(Person)'])
+
+        command = [
+            neo4j_admin, 'database', 'import', 'full', db_name,
+            f'--nodes=Movie={movie_file}',
+            f'--nodes=Genre={genre_file}',
+            f'--nodes=Person={person_file}',
+            '--relationships=BELONGS_TO=' + write('belongs_to.csv', genres[['mid', 'name']],
+                                                  [':START_ID(Movie)', ':END_ID(Genre)'])
+        ]
+        for role_type, pairs in relationships.items():
+            rel_file = write(f'{role_type.lower()}.csv', pairs[['name', 'mid']],
+                             [':START_ID(Person)', ':END_ID(Movie)'])
+            command.append(f'--relationships={role_type}={rel_file}')
+        if overwrite:
+            command.append('--overwrite-destination')
+
+        self.logger.info("Running: %s", " ".join(command))
+        subprocess.run(command, check=True)
+        self.logger.info("Bulk import into database '%s' completed", db_name)
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the IMDB movie knowledge graph in Neo4j")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--bulk", metavar="DATABASE",
+                      help="cold-load DATABASE with neo4j-admin (the database must be stopped)")
+    mode.add_argument("--load-csv", metavar="IMPORT_DIR", nargs="?", const="",
+                      help="import with server-side LOAD CSV, copying the CSV into IMPORT_DIR if given")
+    mode.add_argument("--schema-only", action="store_true",
+                      help="only create constraints and indexes, e.g. after a bulk import")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="with --bulk, replace the existing store of DATABASE")
+    args = parser.parse_args()
+    if args.overwrite and not args.bulk:
+        parser.error("--overwrite requires --bulk")
+
     # Configure logging
     logging.basicConfig(level=logging.INFO)
+    logging.getLogger("neo4j").setLevel(logging.WARNING)
 
     # Neo4j connection configuration
     uri = "neo4j://localhost:7687"
@@ -135,16 +388,26 @@ def main():
         # Create knowledge graph instance
         kg = IMDBKnowledgeGraph(uri, user, password)
 
+        if args.bulk:
+            kg.bulk_import(csv_path, args.bulk, overwrite=args.overwrite)
+            logging.info("Start the database, then run with --schema-only to create constraints and indexes")
+            return
+
         # Create constraints and indexes
         kg.create_constraints_and_indexes()
+        if args.schema_only:
+            return
 
         # Import data
-        kg.import_data(csv_path)
+        if args.load_csv is not None:
+            kg.load_csv(csv_path, args.load_csv or None)
+        else:
+            kg.import_data(csv_path)
 
         logging.info("Data import completed successfully!")
 
     except Exception as e:
-        logging.error(f"Error: {str(e)}")
+        logging.error("Error: %s", e)
 
     finally:
         # Close connection
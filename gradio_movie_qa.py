@@ -1,5 +1,5 @@
 import gradio as gr
-from typing import List, Tuple
+from typing import AsyncIterator, List, Tuple
 import logging
 from llm_movie_qa import EnhancedMovieKnowledgeGraphQA
 from dotenv import load_dotenv
@@ -12,6 +12,9 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OpenAI API key is missing. Please set it in the .env file.")
 
+# Number of questions answered concurrently; well below the Neo4j connection pool size
+CONCURRENCY_LIMIT = 8
+
 class MovieKnowledgeGraphUI:
     def __init__(self, neo4j_uri: str, neo4j_user: str, neo4j_password: str, openai_api_key: str):
         """
@@ -28,30 +31,28 @@ class MovieKnowledgeGraphUI:
         )
         self.logger = logging.getLogger(__name__)
 
-    def process_query(self, question: str, history: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    async def process_query(self, question: str,
+                            history: List[Tuple[str, str]]) -> AsyncIterator[List[Tuple[str, str]]]:
         """
-        Process a user query and update chat history.
+        Process a user query and stream the answer into the chat history.
 
         Args:
             question: User's question.
             history: Chat history.
 
-        Returns:
-            Updated chat history.
+        Yields:
+            Chat history updated with the answer generated so far.
         """
+        history.append((question, ""))
         try:
-            # Generate answer
-            answer = self.qa_system.handle_complex_query(question)
-
-            # Update chat history
-            history.append((question, answer))
-
-            return history
+            async for delta in self.qa_system.stream_complex_query(question):
+                history[-1] = (question, history[-1][1] + delta)
+                yield history
         except Exception as e:
-            self.logger.error(f"Error processing question: {str(e)}")
+            self.logger.error("Error processing question: %s", e)
             error_msg = "I encountered an error while processing your question. Please try again."
-            history.append((question, error_msg))
-            return history
+            history[-1] = (question, error_msg)
+            yield history
 
     def create_interface(self) -> gr.Blocks:
         """
@@ -73,7 +74,8 @@ class MovieKnowledgeGraphUI:
             submit_btn.click(
                 fn=self.process_query,
                 inputs=[question_input, chatbot],
-                outputs=[chatbot]
+                outputs=[chatbot],
+                concurrency_limit=CONCURRENCY_LIMIT
             )
 
             clear_btn.click(fn=lambda: [], inputs=[], outputs=[chatbot])
@@ -83,6 +85,7 @@ class MovieKnowledgeGraphUI:
 def main():
     # Configure logging
     logging.basicConfig(level=logging.INFO)
+    logging.getLogger("neo4j").setLevel(logging.WARNING)
 
     # Configuration
     neo4j_uri = "neo4j://localhost:7687"
@@ -94,6 +97,7 @@ def main():
 
     # Launch Gradio interface
     interface = ui.create_interface()
+    interface.queue(max_size=32, default_concurrency_limit=CONCURRENCY_LIMIT)
     interface.launch(share=True)
 
 if __name__ == "__main__":
@@ -1,8 +1,17 @@
-from neo4j import GraphDatabase
-from typing import Dict, List, Optional
+from neo4j import READ_ACCESS
+from neo4j_connection import get_driver, release_driver
+from cachetools import TTLCache
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+import copy
+import asyncio
+import hashlib
+import httpx
+import itertools
 import logging
 import json
-from openai import OpenAI
+import threading
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 import os
 
@@ -13,9 +22,118 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 if not OPENAI_API_KEY:
     raise ValueError("OpenAI API key is missing. Please set it in the .env file.")
 
+# Bump whenever a system prompt changes so stale cached LLM output is not reused
+PROMPT_VERSION = b"4"
+
+# Maximum number of query result rows shown to the LLM when generating an answer
+MAX_RESULT_ROWS = 20
+
+# Seconds a Cypher result stays cached; queries run in read-only sessions, so nothing to invalidate
+QUERY_CACHE_TTL = 60
+
+# Function schema the LLM must fill in when generating Cypher
+RUN_CYPHER_TOOL = {
+    "type": "function",
+    "function": {
+        "name": "run_cypher",
+        "description": "Run a read-only Cypher query against the movie knowledge graph.",
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "Cypher query referencing every value from the question as a $parameter"
+                },
+                "params": {
+                    "type": "object",
+                    "description": "Values for the $parameters used in the query"
+                }
+            },
+            "required": ["query", "params"]
+        }
+    }
+}
+
+
+class LLMCache:
+    """Thread-safe LRU cache for LLM responses, keyed by a hash of their inputs."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        """Build a content-addressed key from the prompt version and the given inputs."""
+        digest = hashlib.blake2b(PROMPT_VERSION)
+        for part in parts:
+            digest.update(b"\0" + part.encode())
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a copy of the cached value, or None on a miss."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(self._entries[key])
+
+    def put(self, key: str, value: Any):
+        """Store a value, evicting the least recently used entry when full."""
+        with self._lock:
+            self._entries[key] = copy.deepcopy(value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for use as a cache key."""
+    return question.strip().lower()
+
+
+def _summarize(results: List[Dict], max_rows: int = MAX_RESULT_ROWS, max_list: int = 5,
+               max_chars: int = 300) -> List:
+    """
+    Shrink query results before they are serialized into an LLM prompt.
+
+    Args:
+        results: Query results from Neo4j
+        max_rows: Number of rows to keep; any further rows are replaced by a marker
+        max_list: Number of entries to keep from list-valued fields
+        max_chars: Length at which string values are cut off
+
+    Returns:
+        Truncated copy of the results
+    """
+    def shrink(value: Any) -> Any:
+        if isinstance(value, list):
+            kept = [shrink(item) for item in value[:max_list]]
+            if len(value) > max_list:
+                kept.append(f"...({len(value) - max_list} more)")
+            return kept
+        if isinstance(value, dict):
+            return {key: shrink(item) for key, item in value.items()}
+        if isinstance(value, str) and len(value) > max_chars:
+            return value[:max_chars] + "..."
+        return value
+
+    summary = [shrink(row) for row in results[:max_rows]]
+    if len(results) > max_rows:
+        summary.append("...(more rows not shown)")
+    return summary
+
 
 class EnhancedMovieKnowledgeGraphQA:
-    def __init__(self, neo4j_uri: str, neo4j_user: str, neo4j_password: str, openai_api_key: str):
+    def __init__(self, neo4j_uri: str, neo4j_user: str, neo4j_password: str, openai_api_key: str,
+                 database: str = "neo4j",
+                 cypher_model: str = "gpt-4o-mini",
+                 answer_model: str = "gpt-4o",
+                 max_connection_pool_size: int = 50,
+                 connection_acquisition_timeout: float = 30.0,
+                 max_connection_lifetime: float = 600.0,
+                 connection_timeout: float = 15.0):
         """
         Initialize the enhanced QA system with Neo4j and OpenAI connections.
 
@@ -24,16 +142,44 @@ class EnhancedMovieKnowledgeGraphQA:
             neo4j_user: Neo4j username
             neo4j_password: Neo4j password
             openai_api_key: OpenAI API key
+            database: Name of the Neo4j database to query
+            cypher_model: OpenAI model for intent analysis and Cypher generation
+            answer_model: OpenAI model for writing the final answer
+            max_connection_pool_size: Maximum number of pooled Neo4j connections
+            connection_acquisition_timeout: Seconds to wait for a pooled connection
+            max_connection_lifetime: Seconds before a pooled connection is recycled
+            connection_timeout: Seconds to wait when opening a new connection
         """
-        self.driver = GraphDatabase.driver(neo4j_uri, auth=(neo4j_user, neo4j_password))
-        self.llm_client = OpenAI(api_key=openai_api_key)
+        self.driver = get_driver(
+            neo4j_uri, neo4j_user, neo4j_password,
+            max_connection_pool_size=max_connection_pool_size,
+            connection_acquisition_timeout=connection_acquisition_timeout,
+            max_connection_lifetime=max_connection_lifetime,
+            connection_timeout=connection_timeout
+        )
+        # One pooled HTTP/2 client keeps connections to the OpenAI API alive across requests
+        self.http_client = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=20)
+        )
+        self.llm_client = AsyncOpenAI(api_key=openai_api_key, http_client=self.http_client)
+        self.llm_cache = LLMCache()
+        self.query_cache = TTLCache(maxsize=1024, ttl=QUERY_CACHE_TTL)
+        self.query_cache_lock = threading.Lock()
+        self.cypher_model = cypher_model
+        self.answer_model = answer_model
+        self.database = database
         self.logger = logging.getLogger(__name__)
 
     def close(self):
-        """Close the database connection."""
-        self.driver.close()
+        """Release the shared database driver."""
+        release_driver(self.driver)
+
+    async def aclose(self):
+        """Close the OpenAI HTTP client."""
+        await self.llm_client.close()
 
-    def get_question_intent(self, question: str) -> Dict:
+    async def get_question_intent(self, question: str) -> Dict:
         """
         Analyze the intent of the user's question and extract entities.
 
@@ -45,6 +191,11 @@ class EnhancedMovieKnowledgeGraphQA:
                 - primary_intent: The primary intent of the question (e.g., "movie_search", "person_info").
                 - entities: Extracted entities (e.g., movie names, actor names, genres).
         """
+        cache_key = LLMCache.key("intent", normalize_question(question))
+        cached = self.llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         try:
             # Define the prompt for the LLM
             system_prompt = """
@@ -57,8 +208,8 @@ class EnhancedMovieKnowledgeGraphQA:
             user_prompt = f"Question: {question}"
 
             # Call OpenAI's API
-            response = self.llm_client.chat.completions.create(
-                model="gpt-4-1106-preview",
+            response = await self.llm_client.chat.completions.create(
+                model=self.cypher_model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
@@ -67,22 +218,29 @@ class EnhancedMovieKnowledgeGraphQA:
             )
 
             # Parse and return the response as a dictionary
-            return json.loads(response.choices[0].message.content.strip())
+            intent = json.loads(response.choices[0].message.content.strip())
+            self.llm_cache.put(cache_key, intent)
+            return intent
 
         except Exception as e:
-            self.logger.error(f"Error analyzing question intent: {e}")
+            self.logger.error("Error analyzing question intent: %s", e)
             return {"primary_intent": None, "entities": {}}
 
-    def generate_cypher_query(self, question: str) -> str:
+    async def generate_cypher_query(self, question: str) -> Tuple[str, Dict]:
         """
-        Use LLM to generate a Cypher query from a natural language question.
+        Use LLM to generate a parameterized Cypher query from a natural language question.
 
         Args:
             question: Natural language question
 
         Returns:
-            Generated Cypher query
+            Tuple of the generated Cypher query and its parameters
         """
+        cache_key = LLMCache.key("cypher", normalize_question(question))
+        cached = self.llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
         system_prompt = """
         You are a Cypher query generator for a movie knowledge graph with the following schema:
         Nodes:
@@ -95,45 +253,129 @@ class EnhancedMovieKnowledgeGraphQA:
         - (Person)-[:ACTED_IN]->(Movie)
         - (Person)-[:WROTE]->(Movie)
         - (Movie)-[:BELONGS_TO]->(Genre)
-        
-        Generate only the Cypher query without any explanation or additional text. 
+
+        Never write values taken from the question into the query text; reference them
+        as $parameters and pass their values in params.
+
+        Examples:
+        Question: What movies did Christopher Nolan direct?
+        query: MATCH (p:Person {name: $director})-[:DIRECTED]->(m:Movie)
+               RETURN m.name AS movie, m.year AS year, m.rating AS rating ORDER BY m.rating DESC
+        params: {"director": "Christopher Nolan"}
+
+        Question: Which actors appeared in both The Godfather and The Godfather Part II?
+        query: MATCH (p:Person)-[:ACTED_IN]->(:Movie {name: $first}),
+                     (p)-[:ACTED_IN]->(:Movie {name: $second})
+               RETURN p.name AS actor
+        params: {"first": "The Godfather", "second": "The Godfather Part II"}
+
+        Question: What are the five highest rated crime movies released after 2000?
+        query: MATCH (m:Movie)-[:BELONGS_TO]->(:Genre {name: $genre})
+               WHERE m.year > $year
+               RETURN m.name AS movie, m.year AS year, m.rating AS rating ORDER BY m.rating DESC LIMIT $limit
+        params: {"genre": "Crime", "year": 2000, "limit": 5}
+
+        Question: Who wrote Forrest Gump and what genres is it?
+        query: MATCH (m:Movie {name: $movie})
+               CALL {
+                   WITH m
+                   OPTIONAL MATCH (w:Person)-[:WROTE]->(m)
+                   RETURN collect(w.name) AS writers
+               }
+               CALL {
+                   WITH m
+                   OPTIONAL MATCH (m)-[:BELONGS_TO]->(g:Genre)
+                   RETURN collect(g.name) AS genres
+               }
+               RETURN writers, genres
+        params: {"movie": "Forrest Gump"}
+
+        Always answer by calling run_cypher.
         """
         user_prompt = f"Generate a Cypher query for the question: {question}"
 
-        response = self.llm_client.chat.completions.create(
-            model="gpt-4-1106-preview",
+        response = await self.llm_client.chat.completions.create(
+            model=self.cypher_model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
+            tools=[RUN_CYPHER_TOOL],
+            tool_choice={"type": "function", "function": {"name": "run_cypher"}},
             temperature=0
         )
 
-        # Sanitize the response to remove formatting issues
-        query = response.choices[0].message.content.strip()
-        if query.startswith("```"):
-            query = query.strip("```").strip()  # Remove triple backticks if present
-        return query
+        arguments = json.loads(response.choices[0].message.tool_calls[0].function.arguments)
+        cypher = (arguments["query"], arguments.get("params") or {})
+        self.llm_cache.put(cache_key, cypher)
+        return cypher
 
-    def execute_query(self, cypher_query: str) -> List[Dict]:
+    def execute_query(self, cypher_query: str, params: Optional[Dict] = None,
+                      fetch_size: int = 1000) -> Iterator[Dict]:
         """
         Execute the generated Cypher query on Neo4j.
 
         Args:
             cypher_query: Cypher query string
+            params: Query parameters, bound server-side
+            fetch_size: Number of records pulled from the server per round trip
 
-        Returns:
-            List of query results
+        Yields:
+            Query results, one record at a time as they arrive
+
+        Raises:
+            Exception: If the query fails, after logging it
         """
         try:
-            with self.driver.session() as session:
-                results = list(session.run(cypher_query))
-                return [record.data() for record in results]
+            # The query comes from the LLM, so the server must refuse any writes in it
+            with self.driver.session(database=self.database, default_access_mode=READ_ACCESS,
+                                     fetch_size=fetch_size) as session:
+                for record in session.run(cypher_query, params or {}):
+                    yield record.data()
         except Exception as e:
-            self.logger.error(f"Error executing query: {cypher_query}\n{e}")
-            return []
+            self.logger.error("Error executing query: %s with params: %s\n%s", cypher_query, params, e)
+            raise
+
+    def fetch_results(self, cypher_query: str, params: Optional[Dict] = None,
+                      max_rows: int = MAX_RESULT_ROWS) -> List[Dict]:
+        """
+        Fetch the first `max_rows` results of a Cypher query, plus one more if it exists.
+
+        The extra row only tells the caller that the result was truncated. Records
+        are pulled in batches of max_rows + 1, so the rest of a large result is
+        discarded on the server without being sent.
+
+        Args:
+            cypher_query: Cypher query string
+            params: Query parameters, bound server-side
+            max_rows: Number of records the caller will use
+
+        Returns:
+            List of at most max_rows + 1 query results
+
+        Raises:
+            Exception: If the query fails; nothing is cached in that case
+        """
+        digest = hashlib.blake2b(cypher_query.encode())
+        digest.update(json.dumps([params or {}, max_rows], sort_keys=True, default=str).encode())
+        cache_key = digest.digest()
+        with self.query_cache_lock:
+            cached = self.query_cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+
+        results = self.execute_query(cypher_query, params, fetch_size=max_rows + 1)
+        try:
+            rows = list(itertools.islice(results, max_rows + 1))
+        finally:
+            results.close()
 
-    def generate_context_aware_answer(self, question: str, query_results: List[Dict]) -> str:
+        # Only reached when the stream ended normally, so partial results are never cached
+        with self.query_cache_lock:
+            self.query_cache[cache_key] = copy.deepcopy(rows)
+        return rows
+
+    async def generate_context_aware_answer(self, question: str, query_results: List[Dict]) -> AsyncIterator[str]:
         """
         Use LLM to generate a natural language answer with query results.
 
@@ -141,9 +383,17 @@ class EnhancedMovieKnowledgeGraphQA:
             question: Original question
             query_results: Results from Neo4j query
 
-        Returns:
-            Natural language answer
+        Yields:
+            Chunks of the natural language answer as they are generated
         """
+        # Compact, truncated results keep the prompt small
+        results_json = json.dumps(_summarize(query_results), separators=(",", ":"), default=str)
+        cache_key = LLMCache.key("answer", normalize_question(question), results_json)
+        cached = self.llm_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
         system_prompt = """
         You are a helpful movie information assistant. Generate a natural, conversational response 
         using the provided query results. Keep the following guidelines in mind:
@@ -156,57 +406,68 @@ class EnhancedMovieKnowledgeGraphQA:
         user_prompt = f"""
         Question: {question}
         
-        Query Results: {json.dumps(query_results, indent=2)}
+        Query Results: {results_json}
         
         Generate a natural language response based on these results.
         """
 
-        response = self.llm_client.chat.completions.create(
-            model="gpt-4-1106-preview",
+        stream = await self.llm_client.chat.completions.create(
+            model=self.answer_model,
             messages=[
                 {"role": "system", "content": system_prompt},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=0.7
+            temperature=0.7,
+            stream=True
         )
-        return response.choices[0].message.content.strip()
-
-    def handle_complex_query(self, question: str) -> str:
+        chunks = []
+        async for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                chunks.append(delta)
+                yield delta
+        self.llm_cache.put(cache_key, "".join(chunks))
+
+    async def stream_complex_query(self, question: str) -> AsyncIterator[str]:
         """
         Handle complex queries requiring multiple steps or reasoning.
 
         Args:
             question: Complex natural language question
 
-        Returns:
-            Comprehensive answer
+        Yields:
+            Chunks of a comprehensive answer as they are generated
         """
         try:
             # Generate Cypher query using LLM
-            cypher_query = self.generate_cypher_query(question)
-            self.logger.info(f"Generated Cypher Query: {cypher_query}")
-
-            # Execute Cypher query on Neo4j
-            query_results = self.execute_query(cypher_query)
+            cypher_query, params = await self.generate_cypher_query(question)
+            self.logger.info("Generated Cypher Query: %s with params: %s", cypher_query, params)
 
-            # Generate context-aware natural language answer
-            answer = self.generate_context_aware_answer(question, query_results)
+            # Execute Cypher query on Neo4j without blocking the event loop
+            query_results = await asyncio.to_thread(self.fetch_results, cypher_query, params)
 
-            return answer
+            # Stream the context-aware natural language answer
+            async for delta in self.generate_context_aware_answer(question, query_results):
+                yield delta
         except Exception as e:
-            self.logger.error(f"Error handling query '{question}': {e}")
-            return "I encountered an error while processing your question. Please try again."
+            self.logger.error("Error handling query '%s': %s", question, e)
+            yield "I encountered an error while processing your question. Please try again."
 
+    async def handle_complex_query(self, question: str) -> str:
+        """
+        Handle complex queries and wait for the complete answer.
 
-def main():
-    # Configuration
-    neo4j_uri = "neo4j://localhost:7687"
-    neo4j_user = "neo4j"
-    neo4j_password = "neo4j123"
+        Args:
+            question: Complex natural language question
+
+        Returns:
+            Comprehensive answer
+        """
+        return "".join([delta async for delta in self.stream_complex_query(question)]).strip()
 
-    # Create QA system instance
-    qa_system = EnhancedMovieKnowledgeGraphQA(neo4j_uri, neo4j_user, neo4j_password, OPENAI_API_KEY)
 
+async def chat(qa_system: EnhancedMovieKnowledgeGraphQA):
+    """Run the interactive question loop on a single event loop."""
     print("Enhanced Movie Knowledge Graph QA System")
     print("Type 'exit' to quit")
 
@@ -216,11 +477,26 @@ def main():
             if question.lower() == "exit":
                 break
 
-            # Process the question and generate an answer
-            answer = qa_system.handle_complex_query(question)
+            # Process the question and print the answer as it is generated
             print("\nAnswer:")
-            print(answer)
+            async for delta in qa_system.stream_complex_query(question):
+                print(delta, end="", flush=True)
+            print()
+    finally:
+        await qa_system.aclose()
+
 
+def main():
+    # Configuration
+    neo4j_uri = "neo4j://localhost:7687"
+    neo4j_user = "neo4j"
+    neo4j_password = "neo4j123"
+
+    # Create QA system instance
+    qa_system = EnhancedMovieKnowledgeGraphQA(neo4j_uri, neo4j_user, neo4j_password, OPENAI_API_KEY)
+
+    try:
+        asyncio.run(chat(qa_system))
     except KeyboardInterrupt:
         print("\nExiting...")
     finally:
@@ -229,4 +505,3 @@ def main():
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,60 @@
+from neo4j import Driver, GraphDatabase
+from typing import Dict, List, Tuple
+import atexit
+import threading
+
+# Shared drivers and their reference counts, keyed by connection settings
+_drivers: Dict[Tuple, List] = {}
+_lock = threading.Lock()
+
+
+def get_driver(uri: str, user: str, password: str, **pool_kwargs) -> Driver:
+    """
+    Return the process-wide Neo4j driver for the given server and credentials.
+
+    The driver is thread-safe and pools connections internally, so every caller
+    with the same settings shares one instance instead of opening its own pool.
+    Each call must be balanced by a call to release_driver().
+
+    Args:
+        uri: Neo4j database URI
+        user: Username
+        password: Password
+        **pool_kwargs: Connection pool settings passed to GraphDatabase.driver
+
+    Returns:
+        Shared Neo4j driver
+    """
+    key = (uri, user, password, tuple(sorted(pool_kwargs.items())))
+    with _lock:
+        if key not in _drivers:
+            driver = GraphDatabase.driver(uri, auth=(user, password), keep_alive=True, **pool_kwargs)
+            _drivers[key] = [driver, 0]
+        _drivers[key][1] += 1
+        return _drivers[key][0]
+
+
+def release_driver(driver: Driver):
+    """
+    Release a driver obtained from get_driver(), closing it once no user is left.
+
+    Args:
+        driver: Driver returned by get_driver()
+    """
+    with _lock:
+        for key, entry in _drivers.items():
+            if entry[0] is driver:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del _drivers[key]
+                    driver.close()
+                return
+
+
+@atexit.register
+def close_drivers():
+    """Close every shared driver that is still open."""
+    with _lock:
+        for driver, _ in _drivers.values():
+            driver.close()
+        _drivers.clear()
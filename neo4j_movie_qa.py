@@ -1,11 +1,33 @@
-from neo4j import GraphDatabase
+from neo4j_connection import get_driver, release_driver
 import re
 import string
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterable, Iterator, List, Pattern, Tuple, Optional
 import logging
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # Semantic intent matching is optional
+    SentenceTransformer = None
+
+# Minimum cosine similarity for a question to be assigned an intent
+INTENT_THRESHOLD = 0.6
+
+# Minimum cosine similarity for a misspelled name to resolve to a graph entity
+ENTITY_THRESHOLD = 0.8
+
+# Longest word span of a question considered as a candidate entity name
+MAX_ENTITY_WORDS = 4
+
+
+def normalize_name(text: str) -> str:
+    """Lower-case a name or question span and strip surrounding punctuation for lookup."""
+    return text.lower().strip(string.punctuation + " ")
+
 
 class MovieKnowledgeGraphQA:
-    def __init__(self, uri: str, user: str, password: str):
+    def __init__(self, uri: str, user: str, password: str, database: str = "neo4j",
+                 intent_model: Optional[str] = "sentence-transformers/all-MiniLM-L6-v2"):
         """
         Initialize the QA system with Neo4j connection.
 
@@ -13,13 +35,45 @@ class MovieKnowledgeGraphQA:
             uri: Neo4j database URI
             user: Username
             password: Password
+            database: Name of the database to query
+            intent_model: Sentence-transformers model used to classify questions that
+                match no pattern; None disables semantic matching
         """
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        self.driver = get_driver(uri, user, password)
+        self.database = database
         self.logger = logging.getLogger(__name__)
         self.logger.setLevel(logging.INFO)
 
         # Define question patterns and corresponding query templates
         self.question_patterns = self.define_question_patterns()
+        self.question_regex, self.pattern_groups = self.compile_question_patterns()
+
+        # Embed the canonical phrasing of every intent once
+        self.encoder = None
+        if intent_model and SentenceTransformer is not None:
+            try:
+                self.encoder = SentenceTransformer(intent_model)
+                self.intent_labels = [
+                    query_type
+                    for query_type, data in self.question_patterns.items()
+                    for _ in data["examples"]
+                ]
+                self.intent_embeddings = self.encoder.encode(
+                    [example for data in self.question_patterns.values() for example in data["examples"]],
+                    normalize_embeddings=True
+                )
+            except Exception as e:
+                self.encoder = None
+                self.logger.warning("Could not load intent model %s; semantic intent matching is disabled: %s",
+                                    intent_model, e)
+        elif intent_model:
+            self.logger.info("sentence-transformers is not installed; semantic intent matching is disabled")
+
+        # Entity names per node label and their embeddings, loaded on first use
+        self.entity_names: Dict[str, List[str]] = {}
+        self.entity_lookup: Dict[str, Dict[str, str]] = {}
+        self.entity_max_words: Dict[str, int] = {}
+        self.entity_embeddings: Dict[str, np.ndarray] = {}
 
     def define_question_patterns(self) -> Dict:
         """Define question patterns and their corresponding query templates."""
@@ -30,6 +84,16 @@ class MovieKnowledgeGraphQA:
                     r"show me movies directed by (.*)",
                     r"list (.*)'s movies as director"
                 ],
+                "examples": [
+                    "what movies did this director make",
+                    "which films were directed by this person",
+                    "list the movies this filmmaker directed",
+                    "what has this director made",
+                    "films by this director",
+                    "show me this director's filmography",
+                    "what are the best movies from this director"
+                ],
+                "entity_label": "Person",
                 "query": """
                     MATCH (p:Person)-[:DIRECTED]->(m:Movie)
                     WHERE p.name = $param1
@@ -43,6 +107,16 @@ class MovieKnowledgeGraphQA:
                     r"show me movies starring (.*)",
                     r"which movies featured (.*)"
                 ],
+                "examples": [
+                    "what movies did this actor appear in",
+                    "which films does this actress star in",
+                    "list the movies this actor played in",
+                    "what roles has this actor had",
+                    "films starring this person",
+                    "movies with this actor in the cast",
+                    "what are the best movies featuring this actor"
+                ],
+                "entity_label": "Person",
                 "query": """
                     MATCH (p:Person)-[:ACTED_IN]->(m:Movie)
                     WHERE p.name = $param1
@@ -56,24 +130,71 @@ class MovieKnowledgeGraphQA:
                     r"what is the information for (.*)",
                     r"show details of movie (.*)"
                 ],
+                "examples": [
+                    "tell me about this film",
+                    "what is this movie about",
+                    "give me details on this movie",
+                    "who is in the cast of this movie and who directed it",
+                    "what genre is this film and how is it rated",
+                    "when was this movie released",
+                    "information about this film"
+                ],
+                "entity_label": "Movie",
                 "query": """
                     MATCH (m:Movie)
                     WHERE m.name = $param1
-                    OPTIONAL MATCH (p1:Person)-[:DIRECTED]->(m)
-                    OPTIONAL MATCH (p2:Person)-[:ACTED_IN]->(m)
-                    OPTIONAL MATCH (m)-[:BELONGS_TO]->(g:Genre)
+                    CALL {
+                        WITH m
+                        OPTIONAL MATCH (p:Person)-[:DIRECTED]->(m)
+                        RETURN collect(p.name) as directors
+                    }
+                    CALL {
+                        WITH m
+                        OPTIONAL MATCH (p:Person)-[:ACTED_IN]->(m)
+                        RETURN collect(p.name) as actors
+                    }
+                    CALL {
+                        WITH m
+                        OPTIONAL MATCH (m)-[:BELONGS_TO]->(g:Genre)
+                        RETURN collect(g.name) as genres
+                    }
                     RETURN m.name as movie, m.year as year, m.rating as rating,
                            m.certificate as certificate, m.run_time as runtime,
-                           collect(DISTINCT p1.name) as directors,
-                           collect(DISTINCT p2.name) as actors,
-                           collect(DISTINCT g.name) as genres
+                           directors, actors, genres
                 """
             }
         }
 
+    def compile_question_patterns(self) -> Tuple[Pattern, Dict[str, Tuple[str, Optional[int]]]]:
+        """
+        Combine all question patterns into a single case-insensitive alternation.
+
+        Each pattern is wrapped in a named group, so one match call tries them
+        all in definition order and the matching group identifies the query type.
+
+        Returns:
+            Tuple of the compiled regex and a mapping from group name to the
+            query type and the index of its parameter group (if any).
+        """
+        alternatives = []
+        pattern_groups = {}
+        for query_type, data in self.question_patterns.items():
+            for i, pattern in enumerate(data["patterns"]):
+                name = f"{query_type}__{i}"
+                alternatives.append(f"(?P<{name}>{pattern})")
+                pattern_groups[name] = (query_type, re.compile(pattern).groups > 0)
+
+        question_regex = re.compile("|".join(alternatives), re.IGNORECASE)
+
+        # The parameter is the first group inside each named wrapper group
+        for name, (query_type, has_param) in pattern_groups.items():
+            param_index = question_regex.groupindex[name] + 1 if has_param else None
+            pattern_groups[name] = (query_type, param_index)
+        return question_regex, pattern_groups
+
     def close(self):
-        """Close the database connection."""
-        self.driver.close()
+        """Release the shared database driver."""
+        release_driver(self.driver)
 
     def match_question(self, question: str) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -85,16 +206,159 @@ class MovieKnowledgeGraphQA:
         Returns:
             Tuple containing query type and extracted parameter (if any).
         """
-        question = question.strip()
-        for query_type, data in self.question_patterns.items():
-            for pattern in data["patterns"]:
-                match = re.match(pattern, question, re.IGNORECASE)
-                if match:
-                    param = match.group(1).strip(string.punctuation) if len(match.groups()) > 0 else None
-                    return query_type, param
-        return None, None
+        match = self.question_regex.match(question.strip())
+        if not match:
+            return self.classify_question(question)
+
+        query_type, param_index = self.pattern_groups[match.lastgroup]
+        param = match.group(param_index).strip(string.punctuation) if param_index else None
+        if param:
+            param = self.resolve_entity(param, self.question_patterns[query_type]["entity_label"])
+        return query_type, param
+
+    def classify_question(self, question: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Classify a question by embedding similarity to the canonical intent phrasings.
+
+        Args:
+            question: Input question string.
+
+        Returns:
+            Tuple containing query type and the entity found in the question,
+            or (None, None) if no intent is close enough or no entity is found.
+        """
+        if self.encoder is None:
+            return None, None
+
+        query_embedding = self.encoder.encode([question], normalize_embeddings=True)[0]
+        scores = self.intent_embeddings @ query_embedding
+        best = int(np.argmax(scores))
+        if scores[best] < INTENT_THRESHOLD:
+            return None, None
+
+        query_type = self.intent_labels[best]
+        param = self.extract_entity(question, self.question_patterns[query_type]["entity_label"])
+        if param is None:
+            return None, None
+        return query_type, param
+
+    def load_entities(self, label: str) -> List[str]:
+        """
+        Load the entity names of a node label from the graph on first use.
+
+        Args:
+            label: Node label to load names for (e.g. "Person", "Movie").
+
+        Returns:
+            Entity names, longest first.
+
+        Raises:
+            Any driver error; nothing is cached then, so the next question retries.
+        """
+        if label not in self.entity_names:
+            query = f"MATCH (n:{label}) RETURN DISTINCT n.name AS name"
+            with self.driver.session(database=self.database) as session:
+                names = session.execute_read(
+                    lambda tx: [record["name"] for record in tx.run(query) if record["name"]]
+                )
+            self.entity_names[label] = sorted(names, key=len, reverse=True)
+            lookup = {}
+            for name in self.entity_names[label]:
+                lookup.setdefault(normalize_name(name), name)
+            self.entity_lookup[label] = lookup
+            self.entity_max_words[label] = max((len(name.split()) for name in names), default=0)
+        return self.entity_names[label]
+
+    def nearest_entity(self, candidates: List[str], label: str) -> Optional[str]:
+        """
+        Find the entity name most similar to any of the candidate strings.
+
+        The entity names are embedded as normalized float32 vectors the first
+        time a label needs fuzzy matching, so exact lookups never pay for it.
+
+        Args:
+            candidates: Strings that may name an entity, possibly misspelled.
+            label: Node label to search.
+
+        Returns:
+            The closest entity name, or None if none reaches ENTITY_THRESHOLD.
+        """
+        if self.encoder is None or not candidates or not self.load_entities(label):
+            return None
+
+        if label not in self.entity_embeddings:
+            self.entity_embeddings[label] = self.encoder.encode(
+                self.entity_names[label], normalize_embeddings=True
+            ).astype(np.float32)
+        query_embeddings = self.encoder.encode(candidates, normalize_embeddings=True).astype(np.float32)
+        scores = query_embeddings @ self.entity_embeddings[label].T
+        candidate, best = np.unravel_index(int(np.argmax(scores)), scores.shape)
+        if scores[candidate, best] < ENTITY_THRESHOLD:
+            return None
+        return self.entity_names[label][best]
+
+    def resolve_entity(self, name: str, label: str) -> str:
+        """
+        Map an extracted name to the spelling stored in the graph.
+
+        Args:
+            name: Name extracted from the question.
+            label: Node label the name refers to.
 
-    def execute_query(self, query: str, param: Optional[str] = None) -> List[Dict]:
+        Returns:
+            The stored entity name, or the input unchanged if nothing matches.
+        """
+        self.load_entities(label)
+        entity = self.entity_lookup[label].get(normalize_name(name))
+        return entity or self.nearest_entity([name], label) or name
+
+    def extract_entity(self, question: str, label: str) -> Optional[str]:
+        """
+        Find the entity of the given label mentioned in the question.
+
+        Word spans of the question are looked up by their normalized text, so
+        names only match on whole tokens. A one-word name written in different
+        case (e.g. "up" for the movie "Up") may just be an ordinary word; such
+        matches are used only if no longer name and no fuzzy match is found.
+        Fuzzy matching compares short spans against the name embeddings so
+        that misspelled names still resolve.
+
+        Args:
+            question: Input question string.
+            label: Node label to look up names for (e.g. "Person", "Movie").
+
+        Returns:
+            The entity name as stored in the graph, or None if none is mentioned.
+        """
+        self.load_entities(label)
+        lookup = self.entity_lookup[label]
+        tokens = question.split()
+
+        # Longest spans first, so the first confident match is the longest name
+        weak_match = None
+        weak_spans = set()
+        for size in range(min(self.entity_max_words[label], len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                span = " ".join(tokens[start:start + size])
+                name = lookup.get(normalize_name(span))
+                if name is None:
+                    continue
+                if len(name.split()) == 1 and span.strip(string.punctuation) != name:
+                    weak_spans.add(normalize_name(span))
+                    weak_match = weak_match or name
+                    continue
+                return name
+
+        words = [token.strip(string.punctuation) for token in tokens]
+        spans = [
+            " ".join(words[start:start + size])
+            for size in range(1, MAX_ENTITY_WORDS + 1)
+            for start in range(len(words) - size + 1)
+        ]
+        spans = [span for span in spans if span and normalize_name(span) not in weak_spans]
+        return self.nearest_entity(spans, label) or weak_match
+
+    def execute_query(self, query: str, param: Optional[str] = None) -> Iterator[Dict]:
         """
         Execute the Cypher query against the Neo4j database.
 
@@ -102,20 +366,20 @@ class MovieKnowledgeGraphQA:
             query: Cypher query string.
             param: Parameter for the query.
 
-        Returns:
-            List of query results.
+        Yields:
+            Query results, one record at a time as they arrive.
         """
         try:
-            with self.driver.session() as session:
+            with self.driver.session(database=self.database) as session:
                 if param:
                     # Ensure param is passed as a string
-                    results = list(session.run(query, param1=str(param)))
+                    results = session.run(query, param1=str(param))
                 else:
-                    results = list(session.run(query))
-                return [record.data() for record in results]
+                    results = session.run(query)
+                for record in results:
+                    yield record.data()
         except Exception as e:
-            self.logger.error(f"Error executing query: {query} with param: {param}\n{e}")
-            return []
+            self.logger.error("Error executing query: %s with param: %s\n%s", query, param, e)
 
     def answer_question(self, question: str) -> str:
         """
@@ -142,10 +406,10 @@ class MovieKnowledgeGraphQA:
             # Format the response
             return self.format_response(query_type, results)
         except Exception as e:
-            self.logger.error(f"Error processing question '{question}': {str(e)}")
+            self.logger.error("Error processing question '%s': %s", question, e)
             return "I encountered an error while processing your question."
 
-    def format_response(self, query_type: str, results: List[Dict]) -> str:
+    def format_response(self, query_type: str, results: Iterable[Dict]) -> str:
         """
         Format the query results into a readable response.
 
@@ -156,9 +420,6 @@ class MovieKnowledgeGraphQA:
         Returns:
             Formatted response string.
         """
-        if not results:
-            return "No results found."
-
         response = []
         for result in results:
             if query_type in ["director_movies", "actor_movies"]:
@@ -173,12 +434,15 @@ class MovieKnowledgeGraphQA:
                                 f"Actors: {', '.join(result['actors'])}")
             else:
                 response.append(f"{result}")
+        if not response:
+            return "No results found."
         return "\n".join(response)
 
 
 def main():
     # Configure logging
     logging.basicConfig(level=logging.INFO)
+    logging.getLogger("neo4j").setLevel(logging.WARNING)
 
     # Neo4j connection configuration
     uri = "neo4j://localhost:7687"